@@ -0,0 +1,199 @@
+"""
+Simple in-memory antiflood check for the Telegram message handler.
+A user is considered "flooding" when they send more than count_limit
+messages within a sliding window of time_limit seconds; the rate is
+estimated from two adjacent window counters, weighting the older one by
+the fraction of it still visible, so users can't double the limit by
+bursting across a window boundary.
+A token-bucket mode is also available for deployments that prefer a
+smooth sustained rate over a windowed count, and a sliding-log mode for
+the rare cases where the exact per-message window semantics matter.
+No persistent storage is kept: everything lives in a per-instance dict.
+"""
+
+from collections import deque
+from time import monotonic
+
+try:
+    # On Linux CLOCK_MONOTONIC_COARSE is a vDSO read, much cheaper than the
+    # default monotonic clock, and its ~1-4ms resolution is far finer than any
+    # reasonable flood window
+    from functools import partial
+    from time import CLOCK_MONOTONIC_COARSE, clock_gettime
+
+    monotonic = partial(clock_gettime, CLOCK_MONOTONIC_COARSE)
+except ImportError:
+    pass
+
+
+class Antiflood:
+    # Fixed attribute layout: cheaper per-instance memory and faster attribute
+    # access than a __dict__-backed instance
+    __slots__ = ("time_limit", "count_limit", "_flood_data", "_inv_time_limit",
+                 "_sweep_interval", "_last_sweep", "_refill_rate", "is_flooding", "_sweep")
+
+    def __init__(self, time_limit=10, count_limit=5, mode="sliding_window"):
+        """
+        :param time_limit: The length of the observation window, in seconds
+        :param count_limit: Messages allowed inside a single window before the user is flagged
+        :param mode: "sliding_window" (default), "token_bucket" or "sliding_log"
+        """
+        # Window length as a plain float of seconds, compared numerically against
+        # time.monotonic() so the hot path never builds datetime/timedelta objects
+        self.time_limit = float(time_limit)
+        self.count_limit = count_limit
+        # Per-user flood data, keyed by user id
+        self._flood_data = {}
+        # Expired entries are swept lazily so _flood_data stays bounded to the
+        # active user set instead of growing for the whole bot lifetime
+        self._sweep_interval = max(self.time_limit, 60.0)
+        self._last_sweep = monotonic()
+        # Pick the checker once here so is_flooding itself carries no mode branch
+        if mode == "sliding_window":
+            # Multiplying by the reciprocal turns "which window is it" into a
+            # single multiply + int truncation
+            self._inv_time_limit = 1.0 / self.time_limit
+            self.is_flooding = self._is_flooding_window
+            self._sweep = self._sweep_windows
+        elif mode == "token_bucket":
+            # Refill count_limit tokens per time_limit seconds, lazily on each call
+            self._refill_rate = count_limit / self.time_limit
+            self.is_flooding = self._is_flooding_bucket
+            self._sweep = self._sweep_buckets
+        elif mode == "sliding_log":
+            self.is_flooding = self._is_flooding_log
+            self._sweep = self._sweep_logs
+        else:
+            raise ValueError("Unknown antiflood mode: " + str(mode))
+
+    def _init_user(self, user_id, window_id):
+        """
+        Start a fresh window for the given user
+        :param user_id: The id of the user to (re)initialize
+        :param window_id: The id of the current global window
+        """
+        # The entry is a plain [window_id, current_count, previous_count] list:
+        # much smaller than a per-user dict and indexing it is a direct load
+        # instead of a hashed key lookup
+        self._flood_data[user_id] = [window_id, 1, 0]
+
+    def _is_flooding_window(self, user_id, _monotonic=monotonic):
+        """
+        Register a message from the given user and report whether they are flooding
+        :param user_id: The integer id of the user that sent the message (Telegram
+            ids are ints; int keys hash much faster than their str form)
+        :return: True if the user passed the limit in the current window, False otherwise
+        """
+        # _monotonic is bound as a default argument so reading the clock is a
+        # LOAD_FAST instead of a module-global lookup
+        now = _monotonic()
+        if now - self._last_sweep > self._sweep_interval:
+            self._sweep(now)
+        # Bind the hot attributes to locals once for the rest of the call
+        count_limit = self.count_limit
+        # Globally-aligned window id: two ints per user instead of a timestamp
+        position = now * self._inv_time_limit
+        window_id = int(position)
+        entry = self._flood_data.get(user_id)
+        if entry is None:
+            self._init_user(user_id, window_id)
+            return False
+        if entry[0] != window_id:
+            # Roll over: the current window becomes the previous one, or both
+            # reset when more than one whole window has gone by
+            entry[2] = entry[1] if entry[0] == window_id - 1 else 0
+            entry[0] = window_id
+            entry[1] = 0
+        # Estimate the rate over the sliding window, weighting the previous
+        # window by the fraction of it that is still visible
+        estimated = entry[2] * (1.0 - (position - window_id)) + entry[1] + 1
+        # Strictly greater: the count_limit-th message is still allowed, the
+        # next one past it is flooding (same semantics as the bucket mode)
+        if estimated > count_limit:
+            # Cap the counter: a persistent flooder keeps hitting this branch,
+            # so don't let the count grow without bound
+            if entry[1] < count_limit:
+                entry[1] += 1
+            return True
+        entry[1] += 1
+        return False
+
+    def _is_flooding_bucket(self, user_id, _monotonic=monotonic):
+        """
+        Token-bucket variant of the flood check: each message costs one token
+        and tokens refill continuously at count_limit / time_limit per second
+        :param user_id: The integer id of the user that sent the message
+        :return: True if the user's bucket is empty, False otherwise
+        """
+        now = _monotonic()
+        if now - self._last_sweep > self._sweep_interval:
+            self._sweep(now)
+        # Bind the hot attributes to locals once for the rest of the call
+        count_limit = self.count_limit
+        entry = self._flood_data.get(user_id)
+        if entry is None:
+            # A fresh bucket starts full; this message consumes one token
+            self._flood_data[user_id] = [now, count_limit - 1.0]
+            return False
+        # Refill lazily at acquisition time, then charge one token
+        tokens = min(float(count_limit), entry[1] + (now - entry[0]) * self._refill_rate)
+        entry[0] = now
+        if tokens < 1.0:
+            entry[1] = tokens
+            return True
+        entry[1] = tokens - 1.0
+        return False
+
+    def _is_flooding_log(self, user_id, _monotonic=monotonic):
+        """
+        Exact sliding-window variant of the flood check: keeps the timestamps
+        of the most recent messages per user in a deque
+        :param user_id: The integer id of the user that sent the message
+        :return: True if more than count_limit messages fall inside the last
+            time_limit seconds, False otherwise
+        """
+        now = _monotonic()
+        if now - self._last_sweep > self._sweep_interval:
+            self._sweep(now)
+        time_limit = self.time_limit
+        entry = self._flood_data.get(user_id)
+        if entry is None:
+            # count_limit + 1 slots: the log must be able to hold one message
+            # past the limit to prove it was exceeded, not merely reached
+            entry = deque(maxlen=self.count_limit + 1)
+            self._flood_data[user_id] = entry
+        else:
+            while entry and now - entry[0] >= time_limit:
+                entry.popleft()
+        entry.append(now)
+        return len(entry) > self.count_limit
+
+    def _sweep_logs(self, now):
+        """
+        Drop every log whose newest timestamp has already left the window
+        :param now: The current monotonic timestamp
+        """
+        horizon = self.time_limit
+        self._flood_data = {user_id: entry for user_id, entry in self._flood_data.items()
+                            if now - entry[-1] < horizon}
+        self._last_sweep = now
+
+    def _sweep_windows(self, now):
+        """
+        Drop every entry whose windows have both already expired
+        :param now: The current monotonic timestamp
+        """
+        horizon = int(now * self._inv_time_limit) - 1
+        self._flood_data = {user_id: entry for user_id, entry in self._flood_data.items()
+                            if entry[0] >= horizon}
+        self._last_sweep = now
+
+    def _sweep_buckets(self, now):
+        """
+        Drop every entry whose bucket has had time to refill completely
+        :param now: The current monotonic timestamp
+        """
+        horizon = self.time_limit
+        self._flood_data = {user_id: entry for user_id, entry in self._flood_data.items()
+                            if now - entry[0] < horizon}
+        self._last_sweep = now
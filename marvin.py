@@ -3,20 +3,164 @@
 import json
 import logging
 import requests
-import io
-import pickle
 import re
-import html
+import socket
 
-from threading import Thread
+from threading import Lock, Thread
+from queue import Queue
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from praw import Reddit, exceptions, models
-from lxml.html import fromstring
+from lxml.etree import HTMLPullParser
 from urllib import parse as urlparse
+from pathlib import Path
+from ipaddress import ip_address
 from datetime import datetime
 from telegram import MessageEntity, ChatMember, Chat, TelegramError, Update
 from telegram.ext import MessageHandler, Updater, Filters, CallbackContext
-from time import sleep
-from difflib import SequenceMatcher
+from time import monotonic, sleep, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+
+from antiflood import Antiflood
+
+try:
+    # Optional C JSON parser: noticeably faster on (re)load, plain json otherwise
+    import orjson
+except ImportError:
+    orjson = None
+
+# Recognize YouTube watch links and capture the 11-character video id, compiled
+# once at import; unlike the old prefix slicing this ignores trailing query
+# parameters such as &t=30
+_YT_URL_RE = re.compile(r'^https?://(?:www\.youtube\.com/watch\?v=|youtu\.be/)([\w-]{11})')
+# Word tokenizer for the blacklist check: yields alphanumeric runs lazily, so
+# punctuation-glued words are still caught and no token list is materialized
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# id_from_url is a pure string parse, so admins re-pasting the same link
+# (delete, then comment, then approve) hit the cache instead of re-parsing;
+# invalid links raise ClientException, which lru_cache never stores
+_submission_id_from_url = lru_cache(maxsize=128)(models.Submission.id_from_url)
+_comment_id_from_url = lru_cache(maxsize=128)(models.Comment.id_from_url)
+
+# Resolutions for the pre-flight URL check only: link submitters post from a
+# small set of recurring hosts, so caching skips a lookup per repeat host, and
+# the TTL (matching the other caches in this file) keeps a changed DNS record
+# from being trusted for the life of the process. The real fetch still
+# resolves through the OS, so stale entries can't misdirect it
+_dns_cache = {}
+_dns_cache_ttl = 300
+_dns_cache_max = 256
+
+
+def _resolve_host(host):
+    """
+    Resolve every address (IPv4 and IPv6) a host answers with, for the
+    pre-flight URL check; gethostbyname would reject IPv6-only hosts outright
+    :param host: The hostname to resolve
+    :return: A tuple of the distinct address strings
+    """
+    now = monotonic()
+    cached = _dns_cache.get(host)
+    if cached is not None and now - cached[0] < _dns_cache_ttl:
+        return cached[1]
+    addresses = tuple({info[4][0] for info in socket.getaddrinfo(host, None)})
+    if len(_dns_cache) >= _dns_cache_max:
+        # Evict the oldest insertion to keep the cache bounded; the default
+        # absorbs two pool workers racing to drop the same key
+        _dns_cache.pop(next(iter(_dns_cache)), None)
+    _dns_cache[host] = (now, addresses)
+    return addresses
+
+# Shared user-facing messages, defined once instead of being re-concatenated
+# piece by piece inside every handler
+WRONG_GROUP_MESSAGE = ("Spiacente, questo bot funziona solo nel gruppo autorizzato con id "
+                       "{auth} ({tg_group}), non in {current} (attuale)")
+NOT_ADMIN_MESSAGE = "Spiacente, non sei un amministratore."
+REPLY_NEEDED_MESSAGE = "Per usare {command} devi rispondere ad un messaggio"
+INVALID_REDDIT_LINK_MESSAGE = "Il link a cui hai risposto non è un link di reddit valido"
+URL_NEEDED_MESSAGE = ("Il messaggio originale deve contenere una URL "
+                      "o rispondere ad un messaggio con una URL")
+REPLY_URL_NEEDED_MESSAGE = ("Se rispondi ad un messaggio per eliminare un post, "
+                            "il messaggio a cui rispondi deve contenere un link")
+DELETED_POST_HEADER = ("Il tuo post è stato rimosso per la violazione "
+                       "del seguente articolo del regolamento:\n\n")
+DELETED_COMMENT_HEADER = ("Il tuo commento è stato rimosso per la violazione "
+                          "del seguente articolo del regolamento:\n\n")
+
+
+class TelegramSendLimiter:
+    """
+    Blocking token bucket that keeps fanned-out sends under Telegram's global
+    30 messages/second bot cap; interactive one-off replies don't need it,
+    but pool workers and the notification queue can burst past the limit
+    """
+
+    def __init__(self, rate=30.0, capacity=30.0):
+        """
+        :param rate: Tokens refilled per second (sustained messages/second)
+        :param capacity: Maximum burst size in messages
+        """
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._last = monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until the bucket refills when it is empty
+        """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self._rate
+            sleep(wait)
+
+
+def command_gate(needs_admin=False, needs_reply=False):
+    """
+    Decorator for the Telegram command handlers: runs the shared wrong-group /
+    not-admin / not-a-reply checks once, deleting the command message and
+    notifying the sender when a check fails
+    :param needs_admin: True if the command is reserved to group administrators
+    :param needs_reply: True if the command must be used as reply to a message
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, *args):
+            update = args[-1]
+            msg = update.message
+            chat = msg.chat
+            # Check if the command has been used in the correct group
+            if not self.is_message_in_correct_group(chat):
+                self.delete_message_if_admin(chat, msg.message_id)
+                self.send_tg_message_reply_or_private(update,
+                                                      WRONG_GROUP_MESSAGE.format(auth=self.authorized_group_id,
+                                                                                 tg_group=self.tg_group,
+                                                                                 current=chat.id))
+                return
+            # Check if the command has been used from an administrator
+            if needs_admin and not self.is_sender_admin(self.updater.bot, chat.id, msg.from_user.id):
+                self.delete_message_if_admin(chat, msg.message_id)
+                self.send_tg_message_reply_or_private(update, NOT_ADMIN_MESSAGE)
+                return
+            # Check if the command is used as reply to another message
+            if needs_reply and not msg.reply_to_message:
+                self.delete_message_if_admin(chat, msg.message_id)
+                self.send_tg_message_reply_or_private(update,
+                                                      REPLY_NEEDED_MESSAGE.format(
+                                                          command=msg.text.split(' ', 1)[0].strip()))
+                return
+            return handler(self, *args)
+        return wrapper
+    return decorator
 
 
 class MarvinBot:
@@ -25,7 +169,7 @@ class MarvinBot:
     comment_file_name = "content/defaultComment.txt"
     welcome_message_file_name = "content/welcome_message.txt"
     rules_file_name = "content/delete_post_rules.json"
-    cookie_cache_file_name = "content/cookies.pkl"
+    cookie_cache_file_name = "content/cookies.json"
     word_blacklist_file_name = "content/words_blacklist.json"
     auto_pinned_posts_file_name = "content/auto_pinned_posts.json"
 
@@ -33,6 +177,21 @@ class MarvinBot:
     delcomment_command = "/delcomment"
     appost_command = "/appost"
 
+    # Strip the leading command token (including glued variants like
+    # /commenta) in one anchored pass, instead of a full-text str.replace
+    # that also clobbered occurrences in the message body
+    _command_strip_res = {command: re.compile(r"^\s*" + re.escape(command) + r"\S*\s*")
+                          for command in ("/comment", "/postlink", "/posttext",
+                                          "/delrule", "/delcomment", "/appost")}
+
+    # How long a cached admin-status answer stays valid (in seconds)
+    admin_cache_ttl = 60
+
+    # How long a cached page title stays valid (in seconds) and how many
+    # entries the cache may hold before the oldest one is evicted
+    title_cache_ttl = 600
+    title_cache_max = 512
+
     def __init__(self, logger_ref):
         # The subreddit where the bot must post
         self.subreddit = None
@@ -50,8 +209,19 @@ class MarvinBot:
         self.tg_group = None
         # Reference to the reddit instance
         self.reddit = None
-        # Array used to contain all the blacklisted words
-        self.word_blacklist = []
+        # The bot's own reddit username, fetched once at login
+        self.bot_reddit_username = None
+        # The subreddit display name, fetched once at startup; PRAW would
+        # otherwise lazy-load it with a network fetch at each fresh access
+        self.subreddit_display_name = None
+        # The "r/Name" form of the subreddit, used to check where a submission
+        # or comment belongs without building a lazy Subreddit object
+        self.subreddit_name_prefixed = None
+        # The modmail footer of the removal comments, pre-rendered in main()
+        # once the subreddit name is known
+        self.delete_comment_footer = None
+        # Set used to contain all the blacklisted words
+        self.word_blacklist = frozenset()
         # Dictionary used to contain all the rules used when deleting a post
         self.rules = {}
         # Logger Reference
@@ -64,12 +234,73 @@ class MarvinBot:
         self.tg_groups = {}
         # List of auto-pinned posts
         self.auto_pinned_posts = None
+        # The welcome message template, read once at startup (From txt)
+        self.welcome_template = None
         self.posts_to_pin = []
+        # Antiflood check used by the message handler
+        self.antiflood = Antiflood()
+        # Cache of (chat_id, user_id) -> (timestamp, is_admin) answers, so the
+        # admin check does not cost a Telegram round-trip on every command
+        self._admin_cache = {}
+        # Cache of chat_id -> (timestamp, administrators list) for /admin, with
+        # the same TTL as the per-user cache above
+        self._admin_list_cache = {}
+        # Cookie persistence is debounced: fetches only mark the jar dirty and a
+        # periodic job flushes it to disk
+        self._cookies_dirty = False
+        self._cookie_lock = Lock()
+        # Worker pool for the blocking Reddit (and page-title) round-trips, so
+        # they don't stall the Telegram dispatcher thread
+        self._reddit_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="reddit")
+        # Outgoing Telegram notifications from the Reddit stream; a dedicated
+        # sender thread drains it so a slow Telegram API can't stall the stream
+        self._tg_out = Queue(maxsize=512)
+        # Global pacing for fanned-out sends (pool workers + sender thread)
+        self._tg_send_limiter = TelegramSendLimiter()
+        # Cache of normalized URL -> (timestamp, title): links reposted within
+        # the TTL skip the network round-trip entirely
+        self._title_cache = {}
+        # Command dispatch table: one hashed lookup per message instead of an
+        # if/elif ladder; the lambdas read self.subreddit at call time because
+        # it is only connected in main()
+        self._commands = {
+            "/start": self.start,
+            "/id": self.get_id,
+            "/comment": self.comment,
+            "/postlink": lambda update: self.postlink(self.subreddit, update),
+            "/posttext": lambda update: self.posttext(self.subreddit, update),
+            self.delrule_command: self.delrule,
+            self.delcomment_command: self.delcomment,
+            self.appost_command: self.appost,
+            "/admin": self.admin,
+        }
 
     # ---------------------------------------------
     # Util functions
     # ---------------------------------------------
 
+    @staticmethod
+    def load_json_file(file_name):
+        """
+        Load a JSON file from disk, with orjson when available
+        :param file_name: The path of the file to load
+        :return: The parsed JSON content
+        """
+        with open(file_name, "rb") as data_file:
+            raw = data_file.read()
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    @staticmethod
+    def load_text_file(file_name):
+        """
+        Load a UTF-8 text file from disk
+        :param file_name: The path of the file to load
+        :return: The file content as a string
+        """
+        return Path(file_name).read_text(encoding="utf-8")
+
     def get_page_title_from_url(self, page_url: str):
         """
         Function that return the title of the given web page
@@ -77,40 +308,141 @@ class MarvinBot:
         :return: A string that contain the title of the given page
         """
 
-        if page_url.startswith("https://www.youtube.com/watch?v="):
-            video_id = page_url[32:]
-            return self.get_youtube_title_from_url(video_id)
-        elif page_url.startswith("https://youtu.be/"):
-            video_id = page_url[17:]
-            return self.get_youtube_title_from_url(video_id)
+        # Repeats of a recently-seen link answer straight from the cache; the
+        # key ignores scheme/host case and the fragment, which never reach the
+        # server anyway
+        parts = urlparse.urlsplit(page_url)
+        cache_key = (parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query)
+        now = monotonic()
+        cached = self._title_cache.get(cache_key)
+        if cached is not None and now - cached[0] < self.title_cache_ttl:
+            return cached[1]
+
+        youtube_match = _YT_URL_RE.match(page_url)
+        if youtube_match:
+            title = self.get_youtube_title_from_url(youtube_match.group(1))
+        else:
+            title = self.stream_page_title(page_url)
+
+        # Only successful lookups are cached: a None from a timeout or refused
+        # host must stay retryable, not be pinned for the whole TTL
+        if title is not None:
+            if len(self._title_cache) >= self.title_cache_max:
+                # Evict the oldest insertion to keep the cache bounded; the
+                # default absorbs two pool workers racing to drop the same key
+                self._title_cache.pop(next(iter(self._title_cache)), None)
+            self._title_cache[cache_key] = (now, title)
+        return title
+
+    def is_url_fetchable(self, page_url: str):
+        """
+        Check that a URL is worth (and safe) fetching before any network I/O:
+        only http(s) schemes, and the host must not resolve to a private,
+        loopback or otherwise reserved address
+        :param page_url: The url the user asked to fetch
+        :return: True when the fetch may proceed, False otherwise
+        """
+        parts = urlparse.urlsplit(page_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        try:
+            addresses = _resolve_host(parts.hostname)
+        except OSError:
+            # Unresolvable host: the fetch could only fail more slowly
+            return False
+        if not addresses:
+            return False
+        # Every resolved address must be public: a record mixing public and
+        # private answers could otherwise steer the fetch inside the network
+        for address in addresses:
+            try:
+                ip = ip_address(address)
+            except ValueError:
+                return False
+            if ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved:
+                return False
+        return True
+
+    def stream_page_title(self, page_url: str):
+        """
+        Stream a web page and return its title, downloading only up to the
+        closing </title> tag
+        :param page_url: The page to get the title from
+        :return: A string that contain the title of the given page
+        """
+        # Reject bad schemes and non-public hosts before spending a connection
+        # attempt (and its timeout) on them; this also keeps the bot from being
+        # used to probe the network it runs on
+        if not self.is_url_fetchable(page_url):
+            self.logger.info("Refusing to fetch non-public URL: %s", page_url)
+            return None
+
+        # Separate connect/read timeouts so a black-holed host can't hang a
+        # worker; the stream itself is already bounded by the early break below
+        try:
+            r = self.session.get(page_url, stream=True, timeout=(3.05, 10))
+        except requests.RequestException as e:
+            # Connection errors and exhausted retries all mean the same thing
+            # to the caller: no title; the handlers already answer that case
+            self.logger.warning("Title fetch failed for %s: %s", page_url, e)
+            return None
+
+        # Mark the cookie cache dirty; the periodic job persists it later
+        self._cookies_dirty = True
 
-        r = self.session.get(page_url)
+        # Don't parse non-HTML payloads (PDFs, images, raw downloads): there is
+        # no <title> to find, so close the stream before reading any body
+        content_type = r.headers.get("Content-Type", "")
+        if content_type and "html" not in content_type and "xml" not in content_type:
+            r.close()
+            return None
 
-        # Update cookie cache:
+        # Feed the response to the parser chunk by chunk and stop as soon as the
+        # <title> element is closed, so big pages are never fully downloaded or
+        # parsed just to read their title
+        title = None
+        parser = HTMLPullParser(events=("end",))
         try:
-            with open(self.cookie_cache_file_name, "wb") as f:
-                pickle.dump(self.session.cookies, f)
-        except Exception as e:
-            self.logger.warning("Unable to update cached cookies!", exc_info=e)
+            for chunk in r.iter_content(16384):
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag == "title":
+                        title = element.text
+                        break
+                if title is not None:
+                    break
+        except requests.RequestException as e:
+            # A read that dies mid-body is no different from one that never
+            # connected: log it and report the title as missing
+            self.logger.warning("Title fetch failed for %s: %s", page_url, e)
+            return None
+        finally:
+            r.close()
 
-        tree = fromstring(r.content)
-        title = tree.findtext('.//title')
         if title is not None:
             return str(title)
         else:
             return None
 
-    @staticmethod
-    def is_sender_admin(bot, chat_id: int, user_id: int):
+    def is_sender_admin(self, bot, chat_id: int, user_id: int):
         """
         Function that return if the given user is an admin in the given chat
+        The answer is cached for admin_cache_ttl seconds to avoid one
+        get_chat_member round-trip per admin-checked command
         :param bot: The current bot instance
         :param chat_id: The id of the chat
         :param user_id: The id of user to check
         :return: True if the user is an admin in the given chat, False otherwise
         """
+        key = (chat_id, user_id)
+        cached = self._admin_cache.get(key)
+        now = monotonic()
+        if cached is not None and now - cached[0] < self.admin_cache_ttl:
+            return cached[1]
         user_info = bot.get_chat_member(chat_id, user_id)
-        return user_info.status == ChatMember.ADMINISTRATOR or user_info.status == ChatMember.CREATOR
+        is_admin = user_info.status == ChatMember.ADMINISTRATOR or user_info.status == ChatMember.CREATOR
+        self._admin_cache[key] = (now, is_admin)
+        return is_admin
 
     @staticmethod
     def get_user_name(message, user=None):
@@ -127,56 +459,97 @@ class MarvinBot:
         else:
             return user.full_name
 
+    @staticmethod
+    def canonical_url(url):
+        """
+        Normalize a URL for comparison: lowercased, markdown escapes removed,
+        query/fragment ignored and no trailing slash
+        :param url: The url to normalize
+        :return: A (netloc, path) tuple identifying the resource
+        """
+        parts = urlparse.urlsplit(url.replace("\\", "").lower())
+        return parts.netloc, parts.path.rstrip("/")
+
     def remove_url_from_del_reply(self, split_message, url):
         # This method iterate split_message and remove the url to the post, or any other un-wanted item
         # It works adding elements we WANT to another array, final_list, that is later converted to string
+        target = self.canonical_url(url)
         # Check every other string in split_message
         final_list = list()
         for string_split in split_message:
             # If it starts with "http" (is an url)
             if string_split.startswith("http"):
-                # Check if is the post url, if so remove it
-                possible_url = string_split.replace("\\", "")
-                similarity = SequenceMatcher(None, url.lower(), possible_url.lower()).ratio()
-                if possible_url == url or similarity >= 0.9:
-                    # The url is the same, so remove it
-                    # This split remove the first word from a string, the URL in our case
+                # Check if is the post url (same host and path), if so remove it
+                if self.canonical_url(string_split) == target:
                     self.logger.info("removed an url from 'note_message'")
-                else:
-                    # Element not removed, put it in final list
-                    final_list.append(string_split)
-                    self.logger.info("url in 'note_message' not removed")
-            else:
-                # Element not removed, put it in final list
-                final_list.append(string_split)
+                    continue
+                self.logger.info("url in 'note_message' not removed")
+            # Element not removed, put it in final list
+            final_list.append(string_split)
         final_string = " ".join(final_list)
         return final_string
 
+    def build_delete_comment(self, header, rule_text, note_message):
+        """
+        Assemble a removal comment from the pre-rendered boilerplate
+        :param header: The per-kind first line (post or comment variant)
+        :param rule_text: The text of the violated rule
+        :param note_message: The optional extra note from the admin
+        :return: The full markdown comment to post
+        """
+        note = f"{note_message}\n\n" if note_message is not None and len(note_message) > 1 else ""
+        return f"{header}* {rule_text}\n\n{note}{self.delete_comment_footer}"
+
     def check_blacklist(self, text):
-        words = text.split()
-        words.sort()
-
-        index_t = 0
-        index_b = 0
-        while index_t < len(words) and index_b < len(self.word_blacklist):
-            if words[index_t] == self.word_blacklist[index_b]:
-                return words[index_t]
-            elif words[index_t] > self.word_blacklist[index_b]:
-                index_b = index_b + 1
-            else:
-                index_t = index_t + 1
+        blacklist = self.word_blacklist
+        # Single short-circuiting expression: the token scan stays inside the
+        # generator protocol instead of re-entering bytecode per word
+        return next((word for match in _WORD_RE.finditer(text)
+                     if (word := match.group().lower()) in blacklist), None)
 
-        return None
+    def run_on_reddit_pool(self, func, *args):
+        """
+        Run a blocking Reddit interaction on the worker pool, logging failures
+        :param func: The function to run
+        :param args: The arguments to pass to the function
+        """
 
-    def delete_message_with_delay(self, tg_group_id, message_id, seconds_delay):
+        def _log_error(future):
+            error = future.exception()
+            if error is not None:
+                self.logger.error(msg="Exception in a Reddit pool task:", exc_info=error)
+
+        self._reddit_pool.submit(func, *args).add_done_callback(_log_error)
+
+    def _delete_message_job(self, context: CallbackContext):
         """
-        Delete message with delay (no admin check, check before using)
-        :param tg_group_id: the id of the group we want to delete the message from
-        :param message_id: the id of the message to delete
-        :param seconds_delay: delay of the delete (in seconds)
+        Job queue callback that performs a scheduled message deletion
+        :param context: context object passed to the callback by the JobQueue
+        """
+        tg_group_id, message_id = context.job.context
+        context.bot.delete_message(tg_group_id, message_id)
+
+    def flush_cookies(self, context: CallbackContext = None):
+        """
+        Persist the session cookie jar to disk if it changed since the last
+        flush; ran periodically by the JobQueue and once at shutdown
+        :param context: context object passed to the callback by the JobQueue
         """
-        sleep(seconds_delay)
-        self.updater.bot.delete_message(tg_group_id, message_id)
+        if not self._cookies_dirty:
+            return
+        with self._cookie_lock:
+            self._cookies_dirty = False
+            # Plain JSON instead of a pickled jar: nothing in a cookie needs
+            # pickle, and JSON can't execute anything when loaded back
+            cookies = [{"name": cookie.name, "value": cookie.value,
+                        "domain": cookie.domain, "path": cookie.path}
+                       for cookie in self.session.cookies]
+            try:
+                with open(self.cookie_cache_file_name, "wb") as f:
+                    f.write(orjson.dumps(cookies) if orjson is not None
+                            else json.dumps(cookies).encode("utf-8"))
+            except Exception as e:
+                self.logger.warning("Unable to update cached cookies!", exc_info=e)
 
     def delete_message_if_admin(self, tg_group, message_id, seconds_delay=0):
         """
@@ -184,29 +557,20 @@ class MarvinBot:
         :param tg_group: the group we want to delete the message from
         :param message_id: the id of the message to delete
         :param seconds_delay: delay of the delete (in seconds)
-        an alternative is to use something like this, to use the bot job system:
-        context.job_queue.run_once(self.delay_function, 5, context=message, name=str(chat_id))
         """
 
         if tg_group.id not in self.tg_groups:
             self.tg_groups[tg_group.id] = tg_group
-            is_admin = self.is_sender_admin(self.updater.bot, tg_group.id, self.updater.bot.id)
-            self.tg_groups[tg_group.id].is_admin = is_admin
-            if is_admin:
-                if seconds_delay > 0:
-                    delete_thread = Thread(target=self.delete_message_with_delay,
-                                           args=[tg_group.id, message_id, seconds_delay])
-                    delete_thread.start()
-                else:
-                    self.updater.bot.delete_message(tg_group.id, message_id)
-        else:
-            if self.tg_groups[tg_group.id].is_admin:
-                if seconds_delay > 0:
-                    delete_thread = Thread(target=self.delete_message_with_delay,
-                                           args=[tg_group.id, message_id, seconds_delay])
-                    delete_thread.start()
-                else:
-                    self.updater.bot.delete_message(tg_group.id, message_id)
+            self.tg_groups[tg_group.id].is_admin = self.is_sender_admin(self.updater.bot, tg_group.id,
+                                                                        self.updater.bot.id)
+        if self.tg_groups[tg_group.id].is_admin:
+            if seconds_delay > 0:
+                # Delayed deletions share the JobQueue scheduler thread instead
+                # of spawning a dedicated thread that only sleeps
+                self.updater.job_queue.run_once(self._delete_message_job, seconds_delay,
+                                                context=(tg_group.id, message_id))
+            else:
+                self.updater.bot.delete_message(tg_group.id, message_id)
 
     def is_message_in_correct_group(self, chat: Chat):
         """
@@ -222,13 +586,11 @@ class MarvinBot:
         :param post_submission: The submitted post where the bot should add the comment
         :param tg_msg_id: The msg id of the message the original post come from
         """
-        string_to_send = self.default_comment_content
-        if tg_msg_id is None:
-            string_to_send = string_to_send.replace("{TG_MSG_ID}", "")
-        else:
-            string_to_send = string_to_send.replace("{TG_MSG_ID}", "/" + str(tg_msg_id))
-        string_to_send = string_to_send.replace("{SUBREDDIT}", str(self.subreddit))
-        string_to_send = string_to_send.replace("{TG_GROUP}", str(self.tg_group))
+        # Only {TG_MSG_ID} is left in the template: the constant subreddit and
+        # group placeholders were baked in at startup
+        string_to_send = self.default_comment_content.format_map({
+            "TG_MSG_ID": "" if tg_msg_id is None else "/" + str(tg_msg_id),
+        })
 
         comment = post_submission.reply(string_to_send)
         comment.mod.distinguish(sticky=True)
@@ -241,12 +603,35 @@ class MarvinBot:
         :returns video title
         """
 
-        url_get = "https://www.youtube.com/watch?v=" + video_id
+        video_url = "https://www.youtube.com/watch?v=" + video_id
+
+        # The oEmbed endpoint answers with a tiny JSON document instead of the
+        # full watch page, and its title needs no HTML un-escaping
+        try:
+            r = self.session.get("https://www.youtube.com/oembed",
+                                 params={"url": video_url, "format": "json"},
+                                 timeout=5)
+            return "[YouTube] " + r.json()["title"]
+        except Exception as e:
+            self.logger.warning("YouTube oEmbed lookup failed, scraping the watch page", exc_info=e)
+
+        # Fallback: stream the watch page like any other page, stopping at its
+        # <title> instead of downloading and regex-scanning the whole body
+        title = self.stream_page_title(video_url)
+        if title is None:
+            return None
+        return "[YouTube] " + title.removesuffix(" - YouTube")
 
-        # http get request to obtain video info
-        contents = self.session.get(url_get)
-        title = re.search("<title>([\w\W]*)<\/title>", contents.text)
-        return "[YouTube] " + html.unescape(title.group(1)[0:-10])
+    def send_rate_limited(self, chat_id, text, **kwargs):
+        """
+        Send a Telegram message after taking a token from the global limiter;
+        used by the pool workers and the notification sender, which can burst
+        :param chat_id: The chat to send the message to
+        :param text: The text to send
+        :return: The sent telegram.Message
+        """
+        self._tg_send_limiter.acquire()
+        return self.updater.bot.send_message(chat_id, text, **kwargs)
 
     def send_tg_message_reply_or_private(self, update: Update, text):
         """
@@ -257,13 +642,12 @@ class MarvinBot:
         try:
             self.updater.bot.send_message(update.message.from_user.id, text)
         except TelegramError:
-            if update.message.from_user.username is None:
-                text_to_send = "[" + str(update.message.from_user.first_name)
-                if update.message.from_user.last_name is not None:
-                    text_to_send += " " + str(update.message.from_user.last_name)
-                text_to_send += ", imposta un username!]" + "\n" + text
+            user = update.message.from_user
+            if user.username is None:
+                last_name = " " + user.last_name if user.last_name is not None else ""
+                text_to_send = f"[{user.first_name}{last_name}, imposta un username!]\n{text}"
             else:
-                text_to_send = "@" + str(update.message.from_user.username) + "\n" + text
+                text_to_send = f"@{user.username}\n{text}"
             self.updater.bot.send_message(chat_id=update.message.chat.id,
                                           text=text_to_send)
 
@@ -282,91 +666,88 @@ class MarvinBot:
         else:
             self.delete_message_if_admin(update.message.chat, update.message.message_id)
 
+    @command_gate(needs_reply=True)
     def comment(self, update: Update):
         """ (Telegram command)
         Adds a comment to a reddit post (only if it belong to the authorized subreddit)
         :param update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
-        # Check if the command is used as reply to another message
-        if not update.message.reply_to_message:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Per usare /comment devi rispondere ad un messaggio")
-            return
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
         # Check that the message has the url
-        urls_entities = update.message.reply_to_message.parse_entities([MessageEntity.URL])
+        urls_entities = reply.parse_entities([MessageEntity.URL])
         if not urls_entities:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Per usare questo comando devi rispondere "
                                                   "ad un messaggio del bot contenente un link")
             return
 
-        # Get the comment content
-        comment_content = update.message.text_markdown  # Full comment content
-        if comment_content.replace("/comment", "").strip() == '':
+        # Get the comment content, without the leading /comment token (this
+        # also removes different characters, such as /commenta)
+        comment_content = self._command_strip_res["/comment"].sub("", msg.text_markdown, 1).strip()
+        if comment_content == '':
             # Empty comment, remove the post
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             return
 
-        # Remove the first word, because it is /comment (also remove different characters, such as /commenta)
-        comment_content = comment_content.split(' ', 1)[1].strip()
-
         # Add header for the comment in the subreddit
-        comment_text = "\\[[Telegram](https://t.me/" + str(self.tg_group) + "/" + str(update.message.message_id) + "/)"
-        username = self.get_user_name(update.message)
-        comment_text += " - "
-        comment_text += "[" + username + "](https://t.me/" + username[1:] + ")" + "\\]  \n"
-        comment_text += comment_content
-        url = urls_entities.popitem()[1]
+        username = self.get_user_name(msg)
+        comment_text = (f"\\[[Telegram](https://t.me/{self.tg_group}/{msg.message_id}/)"
+                        f" - [{username}](https://t.me/{username[1:]})\\]  \n{comment_content}")
+        url = next(iter(urls_entities.values()))
         try:
-            cut_url = models.Submission.id_from_url(url)
+            cut_url = _submission_id_from_url(url)
         except exceptions.ClientException:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
-                                                  "Il link a cui hai risposto non è un link di reddit valido")
+                                                  INVALID_REDDIT_LINK_MESSAGE)
             return
+
+        # Everything from here on talks to Reddit: run it off the dispatcher
+        self.run_on_reddit_pool(self._comment_on_reddit, update, comment_text, cut_url)
+
+    def _comment_on_reddit(self, update: Update, comment_text, cut_url):
+        """
+        Slow half of /comment, ran on the Reddit worker pool
+        :param update: an object that represents an incoming update.
+        :param comment_text: The already-formatted comment to post
+        :param cut_url: The id of the submission to comment
+        """
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
         submission = self.reddit.submission(id=cut_url)
-        if submission.subreddit.display_name == self.subreddit.display_name:
+        if submission.subreddit_name_prefixed == self.subreddit_name_prefixed:
             if submission.locked:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, msg.message_id)
                 self.send_tg_message_reply_or_private(update,
                                                       "Non puoi commentare un post lockato!")
             else:
                 good_check = self.check_blacklist(comment_text)
                 if good_check is None:
                     created_comment = submission.reply(comment_text)
-                    comment_link = "https://www.reddit.com" + created_comment.permalink
-                    self.updater.bot.send_message(self.authorized_group_id,
-                                                  "Commento aggiunto al post! (da: " + self.get_user_name(
-                                                      update.message)
-                                                  + ")\n" + comment_link,
-                                                  reply_to_message_id=update.message.reply_to_message.message_id)
-                    self.logger.info("Comment added to post with id: " + str(cut_url))
+                    self.send_rate_limited(self.authorized_group_id,
+                                           f"Commento aggiunto al post! (da: {self.get_user_name(msg)})\n"
+                                                  f"https://www.reddit.com{created_comment.permalink}",
+                                                  reply_to_message_id=reply.message_id)
+                    self.logger.info("Comment added to post with id: %s", cut_url)
                 else:
-                    self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                    self.delete_message_if_admin(chat, msg.message_id)
                     self.send_tg_message_reply_or_private(update,
                                                           "Il tuo commento contiene la seguente parola bandita: " +
                                                           str(good_check)
                                                           )
         else:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non puoi inviare commenti a post"
                                                   "che non appartengono al subreddit: " +
-                                                  self.subreddit.display_name)
+                                                  self.subreddit_display_name)
 
+    @command_gate(needs_reply=True)
     def postlink(self, subreddit, update):
         """ (Telegram command)
         Read the link and post it in the subreddit
@@ -374,73 +755,74 @@ class MarvinBot:
         :param update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
-
-        # Check if the command is used as reply to another message
-        if not update.message.reply_to_message:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Per usare /postlink devi rispondere ad un messaggio")
-            return
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
 
-        reply_message = update.message.reply_to_message
-
-        urls_entities = reply_message.parse_entities([MessageEntity.URL])
+        urls_entities = reply.parse_entities([MessageEntity.URL])
         if not urls_entities:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Il messaggio originale deve contenere un URL")
             return
         if len(urls_entities) > 1:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Il messaggio originale deve contenere un **solo** URL")
             return
 
-        link_to_post = urls_entities.popitem()[1]
+        link_to_post = next(iter(urls_entities.values()))
         # Check link schema
         link_parsed = urlparse.urlparse(link_to_post)
         if not link_parsed.scheme:
             link_to_post = 'https://' + link_to_post
         elif link_parsed.scheme not in ['http', 'https']:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Il messaggio originale deve contenere un link HTTP(S)")
             return
+        # Add language tag if specified parameter E
+        language_tag = ""
+        split_message = self._command_strip_res["/postlink"].sub("", msg.text_markdown, 1).split()
+        if len(split_message) > 0:
+            if split_message[0] == "E":
+                language_tag = "[ENG] "
+
+        # Title fetch and Reddit submission are network-bound: run them off the dispatcher
+        self.run_on_reddit_pool(self._postlink_submit, subreddit, update, link_to_post, language_tag)
+
+    def _postlink_submit(self, subreddit, update: Update, link_to_post, language_tag):
+        """
+        Slow half of /postlink, ran on the Reddit worker pool
+        :param subreddit: The subreddit where the bot should post the link
+        :param update: an object that represents an incoming update.
+        :param link_to_post: The (scheme-normalized) link to submit
+        :param language_tag: The optional "[ENG] " prefix for the title
+        """
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
+
         # Fetch page title
         link_page_title = self.get_page_title_from_url(link_to_post)
         if not link_page_title:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non sono riuscito a trovare il titolo della pagina")
             return
 
-        # Add language tag if specified parameter E
-        language_tag = ""
-        split_message = update.message.text_markdown.replace("/postlink", "").strip().split()
-        if len(split_message) > 0:
-            if split_message[0] == "E":
-                language_tag = "[ENG] "
-
-        # Submit to reddit, add the default comment and send the link to Telegram:
-        title = "[" + self.title_prefix + self.get_user_name(reply_message) + "] " + language_tag + link_page_title
+        # Submit to reddit, add the default comment and send the link to Telegram
+        title = f"[{self.title_prefix}{self.get_user_name(reply)}] {language_tag}{link_page_title}"
         submission = subreddit.submit(title, url=link_to_post)
-        self.add_default_comment(submission, update.message.reply_to_message.message_id)
-        self.updater.bot.send_message(self.authorized_group_id,
-                                      "Post creato: " + str(submission.shortlink) +
-                                      " (da: " + self.get_user_name(update.message) + ")",
-                                      reply_to_message_id=update.message.reply_to_message.message_id)
+        # The sticky comment and the notification don't depend on each other:
+        # run the comment on the pool while this worker sends the message
+        self.run_on_reddit_pool(self.add_default_comment, submission, reply.message_id)
+        self.send_rate_limited(self.authorized_group_id,
+                               f"Post creato: {submission.shortlink} (da: {self.get_user_name(msg)})",
+                               reply_to_message_id=reply.message_id)
         self.logger.info("New link-post submitted")
 
+    @command_gate(needs_reply=True)
     def posttext(self, subreddit, update: Update):
         """ (Telegram command)
         Given a text and a title (from an admin) it create a text post in the subreddit
@@ -448,166 +830,152 @@ class MarvinBot:
         :param update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
-
-        # Check if the command is used as reply to another message
-        if not update.message.reply_to_message:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Per usare /posttext devi rispondere ad un messaggio")
-            return
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
 
-        reply_message = update.message.reply_to_message
-
-        question_title = "[" + self.title_prefix + self.get_user_name(reply_message) + "] "
-        admin_post_title = update.message.text_markdown.replace("/posttext", "").strip()
+        question_title = f"[{self.title_prefix}{self.get_user_name(reply)}] "
+        admin_post_title = self._command_strip_res["/posttext"].sub("", msg.text_markdown, 1).strip()
         if len(admin_post_title) < 1:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Utilizzando il comando, aggiungi "
                                                   "un titolo al post:\n/posttext <titolo>")
             return
         elif len(admin_post_title) < 6:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Serve un titolo più lungo! Riprova")
             return
         else:
             question_title += admin_post_title
 
-        question_content = reply_message.text_markdown
+        question_content = reply.text_markdown
+
+        # The Reddit submission is network-bound: run it off the dispatcher
+        self.run_on_reddit_pool(self._posttext_submit, subreddit, update, question_title, question_content)
 
-        # Submit to reddit, add the default comment and send the link to Telegram:
+    def _posttext_submit(self, subreddit, update: Update, question_title, question_content):
+        """
+        Slow half of /posttext, ran on the Reddit worker pool
+        :param subreddit: The subreddit where the bot should post the content
+        :param update: an object that represents an incoming update.
+        :param question_title: The full title of the post
+        :param question_content: The body of the post
+        """
+        msg = update.message
+        reply = msg.reply_to_message
+
+        # Submit to reddit, add the default comment and send the link to Telegram
         submission = subreddit.submit(question_title, selftext=question_content)
-        self.add_default_comment(submission, update.message.reply_to_message.message_id)
-        self.updater.bot.send_message(self.authorized_group_id,
-                                      "Post creato: " + str(submission.shortlink) +
-                                      " (da: " + self.get_user_name(update.message) + ")",
-                                      reply_to_message_id=update.message.reply_to_message.message_id)
+        # As in _postlink_submit, comment and notification run in parallel
+        self.run_on_reddit_pool(self.add_default_comment, submission, reply.message_id)
+        self.send_rate_limited(self.authorized_group_id,
+                               f"Post creato: {submission.shortlink} (da: {self.get_user_name(msg)})",
+                               reply_to_message_id=reply.message_id)
         self.logger.info("New text-post submitted")
 
+    @command_gate(needs_admin=True)
     def delrule(self, update: Update):
         """ (Telegram command)
         Delete a post from the subreddit, posting the reason as comment reading it from the rule dictionary
         :param update: update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
-
-        # Check if the command has been used from an administrator
-        if not self.is_sender_admin(self.updater.bot, update.message.chat.id, update.message.from_user.id):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, non sei un amministratore.")
-            return
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
 
         # Check if the command is used as reply to another message
         is_reply_to_message = False
-        if not update.message.reply_to_message:
+        if not reply:
             # If no see if it contains an url
-            urls_entities = update.message.parse_entities([MessageEntity.URL])
+            urls_entities = msg.parse_entities([MessageEntity.URL])
             if not urls_entities:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, msg.message_id)
                 self.send_tg_message_reply_or_private(update,
-                                                      "Il messaggio originale deve contenere una URL "
-                                                      "o rispondere ad un messaggio con una URL")
+                                                      URL_NEEDED_MESSAGE)
                 return
         else:
             # Check that the reply message has the url
-            urls_entities = update.message.reply_to_message.parse_entities([MessageEntity.URL])
+            urls_entities = reply.parse_entities([MessageEntity.URL])
             is_reply_to_message = True
             if not urls_entities:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, msg.message_id)
                 self.send_tg_message_reply_or_private(update,
-                                                      "Se rispondi ad un messaggio per eliminare un post, "
-                                                      "il messaggio a cui rispondi deve contenere un link")
+                                                      REPLY_URL_NEEDED_MESSAGE)
                 return
         # Get the rule content, post the comment and delete the post
-        url = urls_entities.popitem()[1]
+        url = next(iter(urls_entities.values()))
         try:
-            cut_url = models.Submission.id_from_url(url)
+            cut_url = _submission_id_from_url(url)
         except exceptions.ClientException:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
-                                                  "Il link a cui hai risposto non è un link di reddit valido")
+                                                  INVALID_REDDIT_LINK_MESSAGE)
             return
-        split_message = update.message.text_markdown.replace(self.delrule_command, "").strip().split()
+        split_message = self._command_strip_res[self.delrule_command].sub("", msg.text_markdown, 1).split()
         note_message = None
-        rule_text = None
-        rule_number = -1
         # Read the rule number
         if len(split_message) == 0:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non hai fornito il numero di regola per rimuovere il post...")
             return
-        elif len(split_message) >= 1:
-            try:
-                if is_reply_to_message:
-                    rule_number = int(split_message[0])
-                else:
-                    rule_number = int(split_message[1])
-            except ValueError:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
-                self.send_tg_message_reply_or_private(update,
-                                                      "Hai fornito un numero di regola non valido... "
-                                                      "Utilizza il comando con " + self.delrule_command +
-                                                      " <numero regola> <note(opzionale)>")
-                return
-            if rule_number not in self.rules:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
-                self.send_tg_message_reply_or_private(update,
-                                                      "Hai fornito un numero di regola non presente nella lista...")
-                return
-            rule_text = self.rules[rule_number]
-        # Read the note message if present
+        if is_reply_to_message:
+            rule_token = split_message[0]
+        else:
+            rule_token = split_message[1] if len(split_message) > 1 else ""
+        # isdigit is cheaper than raising and catching ValueError on bad input
+        if not rule_token.isdigit():
+            self.delete_message_if_admin(chat, msg.message_id)
+            self.send_tg_message_reply_or_private(update,
+                                                  "Hai fornito un numero di regola non valido... "
+                                                  "Utilizza il comando con " + self.delrule_command +
+                                                  " <numero regola> <note(opzionale)>")
+            return
+        # Single dict probe instead of a membership test followed by a lookup
+        rule_text = self.rules.get(int(rule_token))
+        if rule_text is None:
+            self.delete_message_if_admin(chat, msg.message_id)
+            self.send_tg_message_reply_or_private(update,
+                                                  "Hai fornito un numero di regola non presente nella lista...")
+            return
+        # Read the note message if present, rebuilding it from the tokens we
+        # already have: the old .replace chains re-scanned the whole text and
+        # could also clip the rule number out of the note body
         if len(split_message) > 1:
             if is_reply_to_message:
                 # If i reply to a message the number of rule is the parameter 0
-                note_message = update.message.text_markdown.replace(self.delrule_command, "") \
-                    .replace(str(split_message[0]), "") \
-                    .strip()
-                # And pop it from split_message[]
                 del split_message[0]
             else:
                 # If i am not replying to a message the number of rule is the parameter 1, 0 is the URL
-                # Remove the command and the rule number from the message
-                note_message = update.message.text_markdown.replace(self.delrule_command, "") \
-                    .replace(str(split_message[1]), "") \
-                    .strip()
-                # And pop it from split_message[]
                 del split_message[1]
             # Remove the url from the comment note
             note_message = self.remove_url_from_del_reply(split_message, url)
 
+        # The Reddit removal involves several round-trips: run it off the dispatcher
+        self.run_on_reddit_pool(self._delrule_apply, update, cut_url, url, rule_text, note_message,
+                                is_reply_to_message)
+
+    def _delrule_apply(self, update: Update, cut_url, url, rule_text, note_message, is_reply_to_message):
+        """
+        Slow half of /delrule, ran on the Reddit worker pool
+        :param update: an object that represents an incoming update.
+        :param cut_url: The id of the submission to remove
+        :param url: The full url of the submission
+        :param rule_text: The text of the violated rule
+        :param note_message: The optional extra note from the admin
+        :param is_reply_to_message: True if the command was a reply to another message
+        """
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
+
         submission = self.reddit.submission(id=cut_url)
-        if submission.subreddit.display_name == self.subreddit.display_name:
+        if submission.subreddit_name_prefixed == self.subreddit_name_prefixed:
             # Create delete comment
-            delete_comment = "Il tuo post è stato rimosso per la violazione del seguente articolo del regolamento:\n\n"
-            delete_comment += "* " + rule_text + "\n\n"
-            if note_message is not None and len(note_message) > 1:
-                delete_comment += note_message + "\n\n"
-            delete_comment += "Se hai dubbi o domande, ti preghiamo di inviare un messaggio in "
-            delete_comment += "[modmail](https://www.reddit.com/message/compose?to=%2Fr%2F" \
-                              + self.subreddit.display_name + ").\n\n"
+            delete_comment = self.build_delete_comment(DELETED_POST_HEADER, rule_text, note_message)
 
             # Send the comment, remove and lock the post
             comment = submission.reply(delete_comment)
@@ -616,18 +984,18 @@ class MarvinBot:
             mod_object.remove()
             mod_object.lock()
             if is_reply_to_message:
-                self.delete_message_if_admin(update.message.chat, update.message.reply_to_message.message_id)
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, reply.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.updater.bot.send_message(self.admin_group_id,
-                                          "Il post (" + url + ") è stato cancellato! (da: "
-                                          + self.get_user_name(update.message) + ")")
-            self.logger.info("Post with id: " + str(cut_url) + " has been deleted from Telegram")
+                                          f"Il post ({url}) è stato cancellato! (da: {self.get_user_name(msg)})")
+            self.logger.info("Post with id: %s has been deleted from Telegram", cut_url)
         else:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non puoi cancellare post che non appartengono al subreddit: " +
-                                                  self.subreddit.display_name)
+                                                  self.subreddit_display_name)
 
+    @command_gate(needs_admin=True)
     def delcomment(self, update: Update):
         """ (Telegram command)
         Delete a comment from a post in the the subreddit,
@@ -635,88 +1003,76 @@ class MarvinBot:
         :param update: update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
-
-        # Check if the command has been used from an administrator
-        if not self.is_sender_admin(self.updater.bot, update.message.chat.id, update.message.from_user.id):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, non sei un amministratore.")
-            return
+        msg = update.message
+        chat = msg.chat
 
         # Get the comment url
-        urls_entities = update.message.parse_entities([MessageEntity.URL])
+        urls_entities = msg.parse_entities([MessageEntity.URL])
         if not urls_entities:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Il messaggio originale deve contenere una URL")
             return
 
         # Get the rule content, post the comment and lock the comment
-        url = urls_entities.popitem()[1]
+        url = next(iter(urls_entities.values()))
         try:
-            cut_url = models.Comment.id_from_url(url)
+            cut_url = _comment_id_from_url(url)
         except exceptions.ClientException:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Il link fornito non è un link di reddit valido")
             return
-        split_message = update.message.text_markdown.replace(self.delcomment_command, "").strip().split()
+        split_message = self._command_strip_res[self.delcomment_command].sub("", msg.text_markdown, 1).split()
         note_message = None
-        rule_text = None
-        rule_number = -1
         # Read the rule number
         if len(split_message) <= 1:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non hai fornito il numero di regola per rimuovere il commento...")
             return
-        elif len(split_message) > 1:
-            try:
-                rule_number = int(split_message[1])
-            except ValueError:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
-                self.send_tg_message_reply_or_private(update,
-                                                      "Hai fornito un numero di regola non valido... "
-                                                      "Utilizza il comando con " + self.delcomment_command +
-                                                      " <link> <numero regola> <note(opzionale)>")
-                return
-            if rule_number not in self.rules:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
-                self.send_tg_message_reply_or_private(update,
-                                                      "Hai fornito un numero di regola non presente nella lista...")
-                return
-            rule_text = self.rules[rule_number]
-        # Read the note message if present
-        if len(split_message) > 1:
-            # Remove the command and the rule number from the message
-            note_message = update.message.text_markdown.replace(self.delcomment_command, "") \
-                .replace(str(split_message[1]), "") \
-                .strip()
-            # And pop it from split_message[]
-            del split_message[1]
-            # Remove the url from the comment note
-            note_message = self.remove_url_from_del_reply(split_message, url)
+        rule_token = split_message[1]
+        # isdigit is cheaper than raising and catching ValueError on bad input
+        if not rule_token.isdigit():
+            self.delete_message_if_admin(chat, msg.message_id)
+            self.send_tg_message_reply_or_private(update,
+                                                  "Hai fornito un numero di regola non valido... "
+                                                  "Utilizza il comando con " + self.delcomment_command +
+                                                  " <link> <numero regola> <note(opzionale)>")
+            return
+        # Single dict probe instead of a membership test followed by a lookup
+        rule_text = self.rules.get(int(rule_token))
+        if rule_text is None:
+            self.delete_message_if_admin(chat, msg.message_id)
+            self.send_tg_message_reply_or_private(update,
+                                                  "Hai fornito un numero di regola non presente nella lista...")
+            return
+        # Read the note message, rebuilding it from the tokens we already have
+        # (the <= 1 guard above means the rule token is always present here);
+        # the rule number is the parameter 1, 0 is the URL
+        del split_message[1]
+        # Remove the url from the comment note
+        note_message = self.remove_url_from_del_reply(split_message, url)
+
+        # The Reddit removal involves several round-trips: run it off the dispatcher
+        self.run_on_reddit_pool(self._delcomment_apply, update, cut_url, url, rule_text, note_message)
+
+    def _delcomment_apply(self, update: Update, cut_url, url, rule_text, note_message):
+        """
+        Slow half of /delcomment, ran on the Reddit worker pool
+        :param update: an object that represents an incoming update.
+        :param cut_url: The id of the comment to remove
+        :param url: The full url of the comment
+        :param rule_text: The text of the violated rule
+        :param note_message: The optional extra note from the admin
+        """
+        msg = update.message
+        chat = msg.chat
 
         linked_comment = self.reddit.comment(id=cut_url)
-        if linked_comment.subreddit.display_name == self.subreddit.display_name:
+        if linked_comment.subreddit_name_prefixed == self.subreddit_name_prefixed:
             # Create delete comment
-            delete_comment = "Il tuo commento è stato rimosso per la violazione del seguente articolo del regolamento:\n\n"
-            delete_comment += "* " + rule_text + "\n\n"
-            if note_message is not None and len(note_message) > 1:
-                delete_comment += note_message + "\n\n"
-            delete_comment += "Se hai dubbi o domande, ti preghiamo di inviare un messaggio in "
-            delete_comment += "[modmail](https://www.reddit.com/message/compose?to=%2Fr%2F" \
-                              + self.subreddit.display_name + ").\n\n"
+            delete_comment = self.build_delete_comment(DELETED_COMMENT_HEADER, rule_text, note_message)
 
             # Reply with the rule, and make the reply sticky
             reply_comment = linked_comment.reply(delete_comment)
@@ -728,115 +1084,119 @@ class MarvinBot:
             linked_comment.mod.lock()
             reply_comment.mod.lock()
 
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.updater.bot.send_message(self.admin_group_id,
-                                          "Il commento (" + url + ") è stato cancellato! (da: "
-                                          + self.get_user_name(update.message) + ")")
-            self.logger.info("Comment with id: " + str(cut_url) + " has been deleted from Telegram")
+                                          f"Il commento ({url}) è stato cancellato! (da: {self.get_user_name(msg)})")
+            self.logger.info("Comment with id: %s has been deleted from Telegram", cut_url)
         else:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non puoi cancellare commenti che non appartengono al subreddit: " +
-                                                  self.subreddit.display_name)
-    
-    def appost(self, update: Update):
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
+                                                  self.subreddit_display_name)
 
-        # Check if the command has been used from an administrator
-        if not self.is_sender_admin(self.updater.bot, update.message.chat.id, update.message.from_user.id):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, non sei un amministratore.")
-            return
+    @command_gate(needs_admin=True)
+    def appost(self, update: Update):
+        msg = update.message
+        chat = msg.chat
+        reply = msg.reply_to_message
 
         # Check if the command is used as reply to another message
         is_reply_to_message = False
-        if not update.message.reply_to_message:
+        if not reply:
             # If no see if it contains an url
-            urls_entities = update.message.parse_entities([MessageEntity.URL])
+            urls_entities = msg.parse_entities([MessageEntity.URL])
             if not urls_entities:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, msg.message_id)
                 self.send_tg_message_reply_or_private(update,
-                                                      "Il messaggio originale deve contenere una URL "
-                                                      "o rispondere ad un messaggio con una URL")
+                                                      URL_NEEDED_MESSAGE)
                 return
         else:
             # Check that the reply message has the url
-            urls_entities = update.message.reply_to_message.parse_entities([MessageEntity.URL])
+            urls_entities = reply.parse_entities([MessageEntity.URL])
             is_reply_to_message = True
             if not urls_entities:
-                self.delete_message_if_admin(update.message.chat, update.message.message_id)
+                self.delete_message_if_admin(chat, msg.message_id)
                 self.send_tg_message_reply_or_private(update,
-                                                      "Se rispondi ad un messaggio per eliminare un post, "
-                                                      "il messaggio a cui rispondi deve contenere un link")
+                                                      REPLY_URL_NEEDED_MESSAGE)
                 return
         # Get the rule content, post the comment and delete the post
-        url = urls_entities.popitem()[1]
+        url = next(iter(urls_entities.values()))
         try:
-            cut_url = models.Submission.id_from_url(url)
+            cut_url = _submission_id_from_url(url)
         except exceptions.ClientException:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
-                                                  "Il link a cui hai risposto non è un link di reddit valido")
+                                                  INVALID_REDDIT_LINK_MESSAGE)
             return
 
+        # The fetch and approval are network round-trips: run them off the dispatcher
+        self.run_on_reddit_pool(self._appost_apply, update, cut_url)
+
+    def _appost_apply(self, update: Update, cut_url):
+        """
+        Slow half of /appost, ran on the Reddit worker pool
+        :param update: an object that represents an incoming update.
+        :param cut_url: The id of the submission to approve
+        """
+        msg = update.message
+        chat = msg.chat
+
         submission = self.reddit.submission(id=cut_url)
-        if submission.subreddit.display_name == self.subreddit.display_name:
+        if submission.subreddit_name_prefixed == self.subreddit_name_prefixed:
             submission.mod.approve()
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
         else:
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            self.delete_message_if_admin(chat, msg.message_id)
             self.send_tg_message_reply_or_private(update,
                                                   "Non puoi approvare post che non appartengono al subreddit: " +
-                                                  self.subreddit.display_name)
+                                                  self.subreddit_display_name)
 
+    @command_gate()
     def admin(self, update: Update):
         """ (Telegram command)
         Calls every admin available
         :param update: update: an object that represents an incoming update.
         """
 
-        # Check if the command has been used in the correct group
-        if not self.is_message_in_correct_group(update.message.chat):
-            self.delete_message_if_admin(update.message.chat, update.message.message_id)
-            self.send_tg_message_reply_or_private(update,
-                                                  "Spiacente, questo bot funziona solo nel"
-                                                  "gruppo autorizzato con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")" +
-                                                  ", non in " +
-                                                  str(update.message.chat.id) + " (attuale)")
-            return
+        msg = update.message
+        chat = msg.chat
+        # Bind the hot references once: the handler touches the bot and the
+        # chat id several times below
+        bot = self.updater.bot
+        chat_id = chat.id
         to_tag = "I seguenti admin non sono stati contattati in privato e verranno taggati:\n"
         should_tag_in_group = False
         try:
-            for single_admin in self.updater.bot.get_chat_administrators(update.message.chat.id):
+            # Reuse a recent admin list instead of asking Telegram again on
+            # every /admin call
+            now = monotonic()
+            cached = self._admin_list_cache.get(chat_id)
+            if cached is not None and now - cached[0] < self.admin_cache_ttl:
+                admins = cached[1]
+            else:
+                admins = bot.get_chat_administrators(chat_id)
+                self._admin_list_cache[chat_id] = (now, admins)
+            dm_text = f"E' stato richiesto un intervento nel gruppo con id {self.authorized_group_id} ({self.tg_group})"
+            # Fan the DMs out on the worker pool: each send is a full HTTPS
+            # round-trip, so sending them serially scales with the admin count
+            pending = [(single_admin,
+                        self._reddit_pool.submit(self.send_rate_limited, single_admin.user.id, dm_text))
+                       for single_admin in admins
+                       if single_admin.user.username != bot.username]
+            for single_admin, future in pending:
                 try:
-                    if single_admin.user.username == self.updater.bot.username:
-                        # Skip the bot itself
-                        continue
-                    self.updater.bot.send_message(single_admin.user.id,
-                                                  "E' stato richiesto un intervento nel gruppo con id " +
-                                                  str(self.authorized_group_id) + " (" + str(self.tg_group) + ")")
+                    future.result()
                 except TelegramError:
                     if single_admin.user.username:
                         to_tag += "@" + single_admin.user.username + "\n"
                         should_tag_in_group = True
             if should_tag_in_group:
-                self.updater.bot.send_message(update.message.chat.id, to_tag)
+                bot.send_message(chat_id, to_tag)
             # Always confirm success
-            self.updater.bot.send_message(update.message.chat.id, "Gli Admin sono stati contattati.")
+            bot.send_message(chat_id, "Gli Admin sono stati contattati.")
         except TelegramError as e:
-            self.updater.bot.send_message(update.message.chat.id,
-                                          "Errore nella richiesta per la lista di admin [" + e.message + "]")
+            bot.send_message(chat_id,
+                             f"Errore nella richiesta per la lista di admin [{e.message}]")
 
     def pin_if_necessary(self, to_pin, submission):
         """
@@ -844,19 +1204,26 @@ class MarvinBot:
         :param to_pin: the message to pin
         :param submission: the reddit post
         """
+        # A deleted account can't match any rule's user list, and reading
+        # .name off the None author would crash the sender thread
+        author = submission.author
+        if author is None:
+            return
+        # Lowercase once per post; the rules were normalized at load time
+        title = submission.title.lower()
+        author_name = author.name.lower()
         for autopin_rule in self.auto_pinned_posts:
-            if submission.title.lower().find(autopin_rule["text"]) != -1:
-                for authors_pin in autopin_rule["users"]:
-                    if authors_pin == submission.author.name.lower():
-                        self.updater.bot.pin_chat_message(to_pin.chat_id, to_pin.message_id, disable_notification=True)
-                        return
+            if autopin_rule["text"] in title and author_name in autopin_rule["users"]:
+                self.updater.bot.pin_chat_message(to_pin.chat_id, to_pin.message_id, disable_notification=True)
+                return
 
     def get_id(self, update: Update):
         """ (Telegram command)
         Send a message containing the chat id
         :param update: :param update: update: an object that represents an incoming update.
         """
-        self.updater.bot.send_message(update.message.chat.id, "Current chat id:" + str(update.message.chat.id))
+        chat_id = update.message.chat.id
+        self.updater.bot.send_message(chat_id, f"Current chat id:{chat_id}")
 
     # ---------------------------------------------
     # Threads
@@ -867,25 +1234,49 @@ class MarvinBot:
         This function listen for new post being submitted in the connected subreddit
         When a new post appear, it send a Telegram message in the authorized group
         """
-        bot_ref = self.updater.bot
         self.logger.info("check_new_reddit_posts thread started")
         for submission in self.subreddit.mod.stream.modqueue(only="submissions", skip_existing=True):
-            # Check if is too old (3 days)
-            now_time = datetime.now()
-            created_time = datetime.utcfromtimestamp(int(float(submission.created_utc)))
-            if (now_time - created_time).days > 3:
-                self.logger.info("Ignoring post because is too old:" + submission.title)
+            # Check if is too old (3 days), comparing raw epoch seconds instead
+            # of allocating two datetime objects and a timedelta per post
+            if submission.created_utc < time() - 3 * 86400:
+                self.logger.info("Ignoring post because is too old: %s", submission.title)
                 continue
-            notification_content = submission.title + "\n" + \
-                                   "Postato da: " + submission.author.name + "\n" + \
-                                   submission.shortlink
+            # Build the short link locally from the post id: submission.shortlink
+            # would be just as cheap, but going through the id keeps every field
+            # we touch on the partial object the stream already delivered
+            shortlink = f"https://redd.it/{submission.id}"
+            # The author can be None when the account was deleted between
+            # submission and the modqueue fetch
+            author = submission.author
+            author_name = author.name if author is not None else "[deleted]"
+            notification_content = f"{submission.title}\nPostato da: {author_name}\n{shortlink}"
             # Send admin notification
             if self.admin_group_id != 0:
-                bot_ref.send_message(self.admin_group_id, notification_content)
+                self._tg_out.put((self.admin_group_id, notification_content, None))
             # Send notification to everyone in the authorized group
-            if submission.author != self.reddit.user.me().name:
-                to_pin = bot_ref.send_message(self.authorized_group_id, submission.title + "\n" + submission.shortlink)
-                self.pin_if_necessary(to_pin, submission)
+            if author_name != self.bot_reddit_username:
+                self._tg_out.put((self.authorized_group_id,
+                                  f"{submission.title}\n{shortlink}", submission))
+
+    def telegram_sender(self):
+        """
+        Drain the outgoing notification queue, sending one Telegram message at
+        a time; keeps Telegram latency and rate limits off the Reddit stream
+        """
+        self.logger.info("telegram_sender thread started")
+        while True:
+            chat_id, text, submission = self._tg_out.get()
+            try:
+                message_obj = self.send_rate_limited(chat_id, text)
+                if submission is not None:
+                    self.pin_if_necessary(message_obj, submission)
+            except TelegramError as e:
+                self.logger.error("Unable to deliver a queued notification: %s", e)
+            except Exception:
+                # The sender must outlive any single bad item (PRAW lazy
+                # fetches inside pin_if_necessary can raise too): a crash here
+                # strands the queue and blocks the Reddit stream on put()
+                self.logger.exception("Unexpected error while processing a queued notification")
 
     # ---------------------------------------------
     # Bot Start and Error manager
@@ -900,10 +1291,7 @@ class MarvinBot:
         for new_user_obj in update.message.new_chat_members:
             chat_id = update.message.chat.id
             new_user = self.get_user_name(None, new_user_obj)
-            welcome_message = open(self.welcome_message_file_name, 'r').read()
-            welcome_message = welcome_message.replace("{USER}", str(new_user))
-            welcome_message = welcome_message.replace("{LINK}",
-                                                      "https://www.reddit.com/r/ItalyInformatica/wiki/telegramrules")
+            welcome_message = self.welcome_template.replace("{USER}", str(new_user))
 
             message_obj = self.updater.bot.send_message(chat_id=chat_id, text=welcome_message)
             # 300 seconds are 5 minutes
@@ -923,27 +1311,19 @@ class MarvinBot:
         if update is None or update.message is None or update.message.text is None:
             return
 
+        # Drop messages from users that are flooding the group
+        if update.message.from_user is not None and self.antiflood.is_flooding(update.message.from_user.id):
+            self.delete_message_if_admin(update.message.chat, update.message.message_id)
+            return
+
         if update.message.text.startswith("/"):
             # Use first word as command
-            command = update.message.text.split(' ', 1)[0].strip()
-            if command == "/start":
-                self.start(update)
-            elif command == "/id":
-                self.get_id(update)
-            elif command == "/comment":
-                self.comment(update)
-            elif command == "/postlink":
-                self.postlink(self.subreddit, update)
-            elif command == "/posttext":
-                self.posttext(self.subreddit, update)
-            elif command == self.delrule_command:
-                self.delrule(update)
-            elif command == self.delcomment_command:
-                self.delcomment(update)
-            elif command == self.appost_command:
-                self.appost(update)
-            elif command == "/admin":
-                self.admin(update)
+            # partition avoids the list split() allocates; strip still matters
+            # for a command followed only by a newline
+            command = update.message.text.partition(' ')[0].strip()
+            handler = self._commands.get(command)
+            if handler is not None:
+                handler(update)
             else:
                 self.delete_message_if_admin(update.message.chat, update.message.message_id, 5)
 
@@ -952,63 +1332,65 @@ class MarvinBot:
 
     def main(self):
         """Start the bot."""
-        self.logger.info("Starting bot... Reading login Token...")
-
-        # Read the token from the json
-        bot_data_file = None
-        try:
-            with open(self.config_file_name) as data_file:
-                bot_data_file = json.load(data_file)
-        except FileNotFoundError:
-            self.logger.error("FATAL ERROR-->" + self.config_file_name + " FILE NOT FOUND, ABORTING...")
-            quit(1)
         self.logger.info("Starting bot... Reading information from files...")
 
-        # Read the default comment data
-        try:
-            file = io.open(self.comment_file_name, mode="r", encoding="utf-8")
-            self.default_comment_content = file.read()
-            file.close()
-        except FileNotFoundError:
-            self.logger.error("FATAL ERROR-->" + self.comment_file_name + " FILE NOT FOUND, ABORTING...")
-            quit(1)
-
-        # Read the rules used to delete a post
-        try:
-            with open(self.rules_file_name) as data_file:
-                rules_list = json.load(data_file)
-                for current_rule in rules_list["rules"]:
-                    self.rules[current_rule["number"]] = current_rule["text"]
-        except FileNotFoundError:
-            self.logger.error("FATAL ERROR-->" + self.rules_file_name + " FILE NOT FOUND, ABORTING...")
-            quit(1)
-
-        # Read the blacklisted words
-        try:
-            with open(self.word_blacklist_file_name) as data_file:
-                word_blacklist2 = json.load(data_file)
-                for current_word in word_blacklist2["words"]:
-                    self.word_blacklist.append(current_word)
-        except FileNotFoundError:
-            self.logger.error("FATAL ERROR-->" + self.word_blacklist_file_name + " FILE NOT FOUND, ABORTING...")
-            quit(1)
-        self.word_blacklist.sort()
-
-        # Read the auto-pinned posts list
-        try:
-            with open(self.auto_pinned_posts_file_name) as data_file:
-                self.auto_pinned_posts = json.load(data_file)
-        except FileNotFoundError:
-            self.logger.error("FATAL ERROR-->" + self.auto_pinned_posts_file_name + " FILE NOT FOUND, ABORTING...")
-            quit(1)
-
-        # Setup requests session:
+        # Every startup file is mandatory, so load them all through one loop
+        # instead of six copies of the same try/except block
+        loaded = {}
+        manifest = ((self.config_file_name, self.load_json_file),
+                    (self.comment_file_name, self.load_text_file),
+                    (self.rules_file_name, self.load_json_file),
+                    (self.word_blacklist_file_name, self.load_json_file),
+                    (self.auto_pinned_posts_file_name, self.load_json_file),
+                    (self.welcome_message_file_name, self.load_text_file))
+        for file_name, loader in manifest:
+            try:
+                loaded[file_name] = loader(file_name)
+            except FileNotFoundError:
+                self.logger.error("FATAL ERROR--> %s FILE NOT FOUND, ABORTING...", file_name)
+                quit(1)
+
+        # The token and group data
+        bot_data_file = loaded[self.config_file_name]
+        # The default comment data
+        self.default_comment_content = loaded[self.comment_file_name]
+        # The rules used to delete a post; force int keys here so the handlers'
+        # rules.get(int(token)) lookup can never miss on a string-typed number
+        self.rules = {int(current_rule["number"]): current_rule["text"]
+                      for current_rule in loaded[self.rules_file_name]["rules"]}
+        # The blacklisted words, lowercased once so the per-message check can
+        # match case-insensitively with plain hash lookups
+        self.word_blacklist = frozenset(word.lower() for word in loaded[self.word_blacklist_file_name]["words"])
+        # The auto-pinned posts list, normalizing case once here so
+        # pin_if_necessary never lowercases inside its per-post loop
+        self.auto_pinned_posts = [{"text": rule["text"].lower(),
+                                   "users": frozenset(user.lower() for user in rule["users"])}
+                                  for rule in loaded[self.auto_pinned_posts_file_name]]
+        # The welcome message template, read once instead of on every join;
+        # the {LINK} placeholder is constant so fill it in now
+        self.welcome_template = loaded[self.welcome_message_file_name] \
+            .replace("{LINK}", "https://www.reddit.com/r/ItalyInformatica/wiki/telegramrules")
+
+        # Setup requests session with a larger keep-alive connection pool, so
+        # repeated title fetches reuse connections instead of re-handshaking TLS
         self.session = requests.Session()
+        # Two quick retries with a short backoff absorb transient connection
+        # resets without stalling a title fetch for long
+        retries = Retry(total=2, backoff_factor=0.2,
+                        status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # requests already negotiates compressed bodies on its own (gzip and
+        # deflate always, brotli when the brotli package is importable), so no
+        # Accept-Encoding override: forcing "br" here made urllib3 hand raw
+        # Brotli bytes to the title parser on installs without the decoder
 
         # Load cached cookies
         try:
-            with open(self.cookie_cache_file_name, "rb") as f:
-                self.session.cookies.update(pickle.load(f))
+            for cookie in self.load_json_file(self.cookie_cache_file_name):
+                self.session.cookies.set(cookie["name"], cookie["value"],
+                                         domain=cookie["domain"], path=cookie["path"])
         except FileNotFoundError:
             self.logger.info("Unable to load cached cookies, creating new ones automatically.")
 
@@ -1019,16 +1401,34 @@ class MarvinBot:
         # reddit login
         self.logger.info("Starting bot... Connecting to subreddit...")
         self.reddit = Reddit(**bot_data_file["reddit"])
+        # Fetch the bot's own username once: user.me() is an authenticated
+        # round-trip and the submission stream used to pay it per post
+        self.bot_reddit_username = self.reddit.user.me().name
         # Read subreddit
         subreddit_name = bot_data_file["reddit"]["subreddit_name"]
         self.subreddit = self.reddit.subreddit(subreddit_name)
+        self.subreddit_display_name = str(self.subreddit.display_name)
+        self.subreddit_name_prefixed = "r/" + self.subreddit_display_name
+        # Pre-render the constant part of the removal comments: only the rule
+        # text and the optional admin note change per deletion
+        self.delete_comment_footer = ("Se hai dubbi o domande, ti preghiamo di inviare un messaggio in "
+                                      "[modmail](https://www.reddit.com/message/compose?to=%2Fr%2F"
+                                      + self.subreddit_display_name + ").\n\n")
         self.logger.info(
-            "Connected to subreddit: " + str(self.subreddit.display_name) + " - " + str(self.subreddit.title))
+            "Connected to subreddit: %s - %s", self.subreddit_display_name, self.subreddit.title)
         # Read authorized group name
         self.authorized_group_id = int(bot_data_file["telegram"]["authorized_group_id"])
-        self.others_commands_groups = bot_data_file["telegram"]["others_commands_groups"]
+        # frozenset so the per-command group membership test is a hash lookup
+        self.others_commands_groups = frozenset(bot_data_file["telegram"]["others_commands_groups"])
         self.admin_group_id = int(bot_data_file["telegram"]["admin_group_id"])
         self.tg_group = bot_data_file["telegram"]["tg_group"]
+        # The subreddit and group placeholders in the default comment never
+        # change while the bot runs: bake them in now (normalizing the text
+        # file's line endings once) so add_default_comment only has to fill
+        # in the per-post message id
+        self.default_comment_content = (self.default_comment_content.replace("\r\n", "\n")
+                                        .replace("{SUBREDDIT}", self.subreddit_display_name)
+                                        .replace("{TG_GROUP}", str(self.tg_group)))
         # Read the prefix to the post title
         self.title_prefix = bot_data_file["reddit"]["title_prefix"]
         # Create the EventHandler and pass it your bot's token.
@@ -1041,24 +1441,43 @@ class MarvinBot:
         # Welcome message
         dp.add_handler(MessageHandler(filters=Filters.status_update.new_chat_members, callback=self.welcome))
 
-        # Register commands
-        dp.add_handler(MessageHandler(filters=Filters.all, callback=self.message_handler))
+        # Register commands; Filters.text (which includes /commands in v13)
+        # lets the dispatcher skip the callback for stickers, photos and other
+        # updates the handler would immediately discard anyway
+        dp.add_handler(MessageHandler(filters=Filters.text, callback=self.message_handler))
 
         # log all errors
         dp.add_error_handler(self.error_handler)
 
+        # Persist cookies at most once every 30 seconds instead of on every fetch
+        self.updater.job_queue.run_repeating(self.flush_cookies, interval=30, first=30)
+
         self.logger.info("Starting bot... Starting polling and threads...")
 
-        # Start the Bot and the important threads
-        self.updater.start_polling()
+        # Start the Bot and the important threads. A 30 s long poll means one
+        # idle round-trip to api.telegram.org every half minute instead of one
+        # per default timeout, and allowed_updates drops update types (edits,
+        # callbacks, polls) that no handler here ever consumes; joins and welcome
+        # messages arrive as "message" updates, so they still get through
+        self.updater.start_polling(timeout=30, allowed_updates=["message"])
 
-        new_reddit_posts_thread = Thread(target=self.check_new_reddit_posts, args=[])
+        # Daemon: the stream generator blocks in a network read, so a non-daemon
+        # thread would keep the process alive after idle() returns
+        new_reddit_posts_thread = Thread(target=self.check_new_reddit_posts, args=[], daemon=True)
         new_reddit_posts_thread.start()
 
+        telegram_sender_thread = Thread(target=self.telegram_sender, args=[], daemon=True)
+        telegram_sender_thread.start()
+
         self.logger.info("Bot successfully loaded...! Bot ready!")
 
         self.updater.idle()
 
+        # Make sure pending Reddit tasks finish and the latest cookies survive
+        # the shutdown
+        self._reddit_pool.shutdown()
+        self.flush_cookies()
+
 
 if __name__ == '__main__':
     # Enable logging creating logger and file handler
@@ -1066,9 +1485,8 @@ if __name__ == '__main__':
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-    now = datetime.now()
-    filename = str(now.year) + "-" + str(now.month) + "-" + str(now.day) + "-" + str(now.hour) + "-" + str(
-        now.minute) + "-" + str(now.second)
+    # Zero-padded timestamp, so log files sort chronologically
+    filename = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 
     fh = logging.FileHandler('logs/' + filename + '.log')
     fh.setLevel(logging.INFO)